@@ -5,6 +5,8 @@ import zipfile
 from datetime import datetime
 from collections import defaultdict
 
+from pedigree_merge import detect_encoding, merge_pedigree_sources, normalize_id, parse_birth_dates
+
 # --------------------------------------------------
 # Page config
 # --------------------------------------------------
@@ -28,7 +30,7 @@ TRANSLATIONS = {
     "NL": {
         "title": "🐴 Stamboom opschonen: check veelvoorkomende fouten",
         "subtitle": "Upload uw stamboombestand en voer verschillende controles uit.",
-        "upload": "Upload Stamboombestand (CSV)",
+        "upload": "Upload Stamboombestand (CSV, één of meerdere bestanden)",
         "separator": "Bestandsscheidingsteken",
         "comma": "Komma (,)",
         "semicolon": "Puntkomma (;)",
@@ -42,6 +44,27 @@ TRANSLATIONS = {
         "sire_col": "Vader Kolom",
         "dam_col": "Moeder Kolom",
         "dob_col": "Geboortedatum Kolom",
+        "encoding": "Tekencodering",
+        "encoding_auto": "Automatisch (UTF-8 / Latin-1)",
+
+        "sources_title": "📂 Bronbestanden",
+        "sources_text": "**Kies per bestand het scheidingsteken, de tekencodering en de kolomtoewijzing. De bestanden worden op basis van het dier-ID samengevoegd tot één stamboom.**",
+        "merge_success": "✅ {files} bestanden samengevoegd tot {count} records.",
+        "merge_title": "🔀 Samenvoegconflicten",
+        "merge_desc": "Dieren die in meerdere bestanden voorkomen met verschillende ouders of geboortedatum. De waarde uit het eerste bestand wordt aangehouden; ontbrekende waarden worden aangevuld uit latere bestanden. Check deze dieren handmatig.",
+        "merge_metric": "Aantal conflicten",
+        "merge_none": "Geen conflicten tussen de bestanden gevonden! ✅",
+        "merge_download": "Download samenvoegconflicten",
+        "merge_source_col": "Bron",
+        "merge_field_col": "Veld",
+        "merge_kept_col": "Waarde_Stamboom",
+        "merge_kept_source_col": "Bron_Stamboom",
+        "merge_other_col": "Waarde_Conflict",
+        "merge_other_source_col": "Bron_Conflict",
+        "merged_id": "ID",
+        "merged_sire": "Vader",
+        "merged_dam": "Moeder",
+        "merged_dob": "Geboortedatum",
         
         "check1_title": "1️⃣ Ontbrekende dieren",
         "check1_desc": "Zoek dieren die als ouder voorkomen maar niet zelf geregistreerd staan. Voeg deze dieren toe aan de stamboom (met onbekende ouders, onbekende geboortedatum, etc.)",
@@ -103,7 +126,7 @@ TRANSLATIONS = {
     "EN": {
         "title": "🐴 Pedigree cleaning: check common issues",
         "subtitle": "Upload your pedigree file and perform various quality checks.",
-        "upload": "Upload Pedigree File (CSV)",
+        "upload": "Upload Pedigree File (CSV, one or more files)",
         "separator": "File Separator",
         "comma": "Comma (,)",
         "semicolon": "Semicolon (;)",
@@ -117,6 +140,27 @@ TRANSLATIONS = {
         "sire_col": "Sire Column",
         "dam_col": "Dam Column",
         "dob_col": "Date of Birth Column",
+        "encoding": "Encoding",
+        "encoding_auto": "Automatic (UTF-8 / Latin-1)",
+
+        "sources_title": "📂 Source Files",
+        "sources_text": "**Choose the separator, encoding and column mapping for each file. The files are merged into one pedigree based on the animal ID.**",
+        "merge_success": "✅ {files} files merged into {count} records.",
+        "merge_title": "🔀 Merge Conflicts",
+        "merge_desc": "Animals that appear in several files with different parents or date of birth. The value from the first file is kept; missing values are filled in from later files. Check these animals manually.",
+        "merge_metric": "Number of Conflicts",
+        "merge_none": "No conflicts between the files found! ✅",
+        "merge_download": "Download Merge Conflicts",
+        "merge_source_col": "Source",
+        "merge_field_col": "Field",
+        "merge_kept_col": "Value_Pedigree",
+        "merge_kept_source_col": "Source_Pedigree",
+        "merge_other_col": "Value_Conflict",
+        "merge_other_source_col": "Source_Conflict",
+        "merged_id": "ID",
+        "merged_sire": "Sire",
+        "merged_dam": "Dam",
+        "merged_dob": "DateOfBirth",
         
         "check1_title": "1️⃣ Missing Animals",
         "check1_desc": "Find animals that appear as parents but are not registered themselves. Add these animals to the pedigree (with unknown parents, unknown date of birth, etc.)",
@@ -213,6 +257,18 @@ def h2(text):
         unsafe_allow_html=True
     )
 
+# --------------------------------------------------
+# File options
+# --------------------------------------------------
+SEPARATOR_LABELS = {",": "comma", ";": "semicolon", "\t": "tab", "|": "pipe"}
+SEPARATORS = list(SEPARATOR_LABELS)
+ENCODINGS = ["auto", "utf-8", "latin1", "cp1252"]
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_detect_encoding(file_id, _uploaded_file):
+    """Detect the encoding once per uploaded file instead of on every rerun"""
+    return detect_encoding(_uploaded_file)
+
 # --------------------------------------------------
 # Title
 # --------------------------------------------------
@@ -225,57 +281,177 @@ st.markdown(t["subtitle"])
 col1, col2 = st.columns([3, 1])
 
 with col1:
-    uploaded_file = st.file_uploader(t["upload"], type=["csv"])
+    uploaded_files = st.file_uploader(t["upload"], type=["csv"], accept_multiple_files=True)
 
 with col2:
     separator = st.selectbox(
         t["separator"],
-        options=[",", ";", "\t", "|"],
-        format_func=lambda x: {
-            ",": t["comma"],
-            ";": t["semicolon"],
-            "\t": t["tab"],
-            "|": t["pipe"]
-        }[x],
+        options=SEPARATORS,
+        format_func=lambda x: t[SEPARATOR_LABELS[x]],
     )
 
 # --------------------------------------------------
 # Main logic
 # --------------------------------------------------
-if uploaded_file is not None:
+if uploaded_files:
     try:
-        # Try reading with UTF-8 encoding first, fallback to latin1
-        try:
-            df = pd.read_csv(uploaded_file, sep=separator, encoding='utf-8')
-        except UnicodeDecodeError:
-            uploaded_file.seek(0)  # Reset file pointer
-            df = pd.read_csv(uploaded_file, sep=separator, encoding='latin1')
-        
-        st.success(t["success"].format(count=len(df)))
-
-        with st.expander(t["preview"]):
-            st.dataframe(df.head(10), use_container_width=True)
+        if len(uploaded_files) == 1:
+            uploaded_file = uploaded_files[0]
+
+            # Try reading with UTF-8 encoding first, fallback to latin1
+            try:
+                df = pd.read_csv(uploaded_file, sep=separator, encoding='utf-8', dtype=str)
+            except UnicodeDecodeError:
+                uploaded_file.seek(0)  # Reset file pointer
+                df = pd.read_csv(uploaded_file, sep=separator, encoding='latin1', dtype=str)
+
+            st.success(t["success"].format(count=len(df)))
+
+            with st.expander(t["preview"]):
+                st.dataframe(df.head(10), use_container_width=True)
+
+            # --------------------------------------------------
+            # Column mapping
+            # --------------------------------------------------
+            h2(t["col_mapping"])
+            st.markdown(t["col_mapping_text"])
+
+            c1, c2, c3, c4 = st.columns(4)
+            with c1:
+                id_col = st.selectbox(t["id_col"], df.columns)
+            with c2:
+                sire_col = st.selectbox(t["sire_col"], df.columns, index=min(1, len(df.columns)-1))
+            with c3:
+                dam_col = st.selectbox(t["dam_col"], df.columns, index=min(2, len(df.columns)-1))
+            with c4:
+                dob_col = st.selectbox(t["dob_col"], df.columns, index=min(3, len(df.columns)-1))
+
+            df[id_col] = df[id_col].map(normalize_id)
+            df[sire_col] = df[sire_col].map(normalize_id)
+            df[dam_col] = df[dam_col].map(normalize_id)
+            df[dob_col] = parse_birth_dates(df[dob_col])
+
+        else:
+            # --------------------------------------------------
+            # Per-file settings and column mapping
+            # --------------------------------------------------
+            h2(t["sources_title"])
+            st.markdown(t["sources_text"])
+
+            sources = []
+            for source_file in uploaded_files:
+                with st.expander(f"📄 {source_file.name}", expanded=True):
+                    s1, s2 = st.columns(2)
+                    with s1:
+                        source_sep = st.selectbox(
+                            t["separator"],
+                            options=SEPARATORS,
+                            index=SEPARATORS.index(separator),
+                            format_func=lambda x: t[SEPARATOR_LABELS[x]],
+                            key=f"sep_{source_file.file_id}",
+                        )
+                    with s2:
+                        source_enc = st.selectbox(
+                            t["encoding"],
+                            options=ENCODINGS,
+                            format_func=lambda x: t["encoding_auto"] if x == "auto" else x,
+                            key=f"enc_{source_file.file_id}",
+                        )
+                    if source_enc == "auto":
+                        source_enc = cached_detect_encoding(source_file.file_id, source_file)
+
+                    # Only read a preview here; the full file is streamed during the merge
+                    source_file.seek(0)
+                    preview = pd.read_csv(source_file, sep=source_sep, encoding=source_enc, nrows=10)
+                    st.dataframe(preview, use_container_width=True)
+
+                    columns = preview.columns
+                    c1, c2, c3, c4 = st.columns(4)
+                    with c1:
+                        source_id = st.selectbox(t["id_col"], columns, key=f"id_{source_file.file_id}")
+                    with c2:
+                        source_sire = st.selectbox(t["sire_col"], columns, index=min(1, len(columns)-1), key=f"sire_{source_file.file_id}")
+                    with c3:
+                        source_dam = st.selectbox(t["dam_col"], columns, index=min(2, len(columns)-1), key=f"dam_{source_file.file_id}")
+                    with c4:
+                        source_dob = st.selectbox(t["dob_col"], columns, index=min(3, len(columns)-1), key=f"dob_{source_file.file_id}")
+
+                sources.append({
+                    "name": source_file.name,
+                    "file": source_file,
+                    "separator": source_sep,
+                    "encoding": source_enc,
+                    "id_col": source_id,
+                    "sire_col": source_sire,
+                    "dam_col": source_dam,
+                    "dob_col": source_dob,
+                })
 
-        # --------------------------------------------------
-        # Column mapping
-        # --------------------------------------------------
-        h2(t["col_mapping"])
-        st.markdown(t["col_mapping_text"])
-
-        c1, c2, c3, c4 = st.columns(4)
-        with c1:
-            id_col = st.selectbox(t["id_col"], df.columns)
-        with c2:
-            sire_col = st.selectbox(t["sire_col"], df.columns, index=min(1, len(df.columns)-1))
-        with c3:
-            dam_col = st.selectbox(t["dam_col"], df.columns, index=min(2, len(df.columns)-1))
-        with c4:
-            dob_col = st.selectbox(t["dob_col"], df.columns, index=min(3, len(df.columns)-1))
-
-        df[id_col] = df[id_col].astype(str)
-        df[sire_col] = df[sire_col].astype(str)
-        df[dam_col] = df[dam_col].astype(str)
-        df[dob_col] = pd.to_datetime(df[dob_col], errors="coerce")
+            # Uploaded files are keyed on their file_id, which changes on every new upload
+            merge_key = tuple(
+                (source_file.file_id,) + tuple(source[k] for k in source if k != "file")
+                for source_file, source in zip(uploaded_files, sources)
+            )
+            # Keep only the latest merge per session, so reruns reuse it without copying
+            if st.session_state.get("merge_key") != merge_key:
+                st.session_state.pop("merge_result", None)
+                st.session_state["merge_result"] = merge_pedigree_sources(sources)
+                st.session_state["merge_key"] = merge_key
+            records, conflicts = st.session_state["merge_result"]
+
+            id_col = t["merged_id"]
+            sire_col = t["merged_sire"]
+            dam_col = t["merged_dam"]
+            dob_col = t["merged_dob"]
+            df = pd.DataFrame(records, columns=[id_col, sire_col, dam_col, dob_col, t["merge_source_col"]])
+            df[dob_col] = pd.to_datetime(df[dob_col], errors="coerce")
+
+            st.success(t["merge_success"].format(files=len(sources), count=len(df)))
+
+            with st.expander(t["preview"]):
+                st.dataframe(df.head(10), use_container_width=True)
+
+            # --------------------------------------------------
+            # Merge conflicts
+            # --------------------------------------------------
+            h2(t["merge_title"])
+            st.markdown(t["merge_desc"])
+
+            field_names = {1: sire_col, 2: dam_col, 3: dob_col}
+
+            def format_value(value):
+                if isinstance(value, pd.Timestamp):
+                    return value.strftime('%d-%m-%Y')
+                return value
+
+            conflicts_df = pd.DataFrame(
+                [
+                    (animal_id, field_names[field], format_value(kept), kept_source, format_value(other), other_source)
+                    for animal_id, field, kept, kept_source, other, other_source in conflicts
+                ],
+                columns=[
+                    id_col,
+                    t["merge_field_col"],
+                    t["merge_kept_col"],
+                    t["merge_kept_source_col"],
+                    t["merge_other_col"],
+                    t["merge_other_source_col"],
+                ],
+            )
+
+            st.metric(t["merge_metric"], len(conflicts_df))
+
+            if not conflicts_df.empty:
+                st.dataframe(conflicts_df, hide_index=True, use_container_width=True)
+                st.download_button(
+                    label=t["merge_download"],
+                    data=conflicts_df.to_csv(index=False),
+                    file_name="samenvoegconflicten.csv" if language == "NL" else "merge_conflicts.csv",
+                    mime="text/csv",
+                    key="download_merge"
+                )
+            else:
+                st.success(t["merge_none"])
 
         st.divider()
 
@@ -0,0 +1,132 @@
+"""Helpers for merging several pedigree files into one pedigree"""
+import codecs
+import warnings
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+
+UNKNOWN_VALUES = {"0", "", "nan", "None"}
+DEFAULT_DATE_FORMAT = "%d-%m-%Y"
+
+
+def detect_encoding(uploaded_file, chunk_size=1 << 20):
+    """Return 'utf-8' if the whole file decodes as UTF-8, otherwise 'latin1'"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    uploaded_file.seek(0)
+    try:
+        while True:
+            chunk = uploaded_file.read(chunk_size)
+            if not chunk:
+                break
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return "latin1"
+    finally:
+        uploaded_file.seek(0)
+    return "utf-8"
+
+
+def normalize_id(value):
+    """Normalize an animal ID so the same animal matches across files"""
+    value = str(value).strip()
+    return "0" if value in UNKNOWN_VALUES else value
+
+
+def guess_date_format(dates):
+    """Guess the date format from the first date that can be guessed, reading ambiguous dates day-first.
+
+    Returns None if none of the dates can be guessed.
+    """
+    dates = dates.dropna().astype(str).str.strip()
+    with warnings.catch_warnings():
+        # Unambiguous formats such as ISO dates warn that dayfirst is ignored
+        warnings.simplefilter("ignore", UserWarning)
+        for value in dates[dates != ""]:
+            date_format = guess_datetime_format(value, dayfirst=True)
+            if date_format:
+                return date_format
+    return None
+
+
+def parse_birth_dates(dates):
+    """Parse a column of birth dates the same way the merge parses each source"""
+    return pd.to_datetime(dates, format=guess_date_format(dates) or DEFAULT_DATE_FORMAT, errors="coerce")
+
+
+def merge_pedigree_sources(sources, chunksize=50_000):
+    """Merge several pedigree files into one via a hash join on the normalized ID.
+
+    Each source is streamed in chunks and folded into a dict keyed by animal ID,
+    so only the mapped columns of the merged pedigree are kept in memory.
+    The first source that lists an animal wins; unknown parents or dates are
+    filled in from later sources and differing values are reported as conflicts.
+    Duplicates within a single source are kept, so check 2 still finds them.
+    The date format is guessed once per source, day-first like the documented
+    d-m-yyyy format, so neither the chunk size nor the first date of a source
+    changes how an ambiguous date is read.
+    """
+    records = []    # [id, sire, dam, dob, source names]
+    index = {}      # normalized ID -> (position in records, source number)
+    origins = {}    # (position, field) -> source that filled in the value
+    conflicts = []  # (id, field, kept value, kept source, other value, other source)
+
+    for source_no, source in enumerate(sources):
+        cols = [source["id_col"], source["sire_col"], source["dam_col"], source["dob_col"]]
+        seen = set()  # IDs already listed in this source
+        date_format = None
+        source["file"].seek(0)
+        reader = pd.read_csv(
+            source["file"],
+            sep=source["separator"],
+            encoding=source["encoding"],
+            usecols=list(dict.fromkeys(cols)),
+            dtype=str,
+            chunksize=chunksize,
+        )
+
+        for chunk in reader:
+            ids = chunk[source["id_col"]].map(normalize_id)
+            sires = chunk[source["sire_col"]].map(normalize_id)
+            dams = chunk[source["dam_col"]].map(normalize_id)
+            if date_format is None:
+                date_format = guess_date_format(chunk[source["dob_col"]])
+            dobs = pd.to_datetime(chunk[source["dob_col"]], format=date_format or DEFAULT_DATE_FORMAT, errors="coerce")
+
+            for animal_id, sire, dam, dob in zip(ids, sires, dams, dobs):
+                pos, first_source = index.get(animal_id, (None, None))
+                is_duplicate = animal_id in seen
+                seen.add(animal_id)
+                if pos is None or is_duplicate or animal_id == "0":
+                    if pos is None and animal_id != "0":
+                        index[animal_id] = (len(records), source_no)
+                    records.append([animal_id, sire, dam, dob, source["name"]])
+                    continue
+
+                record = records[pos]
+                for field, value in ((1, sire), (2, dam), (3, dob)):
+                    if field == 3:
+                        known_new, known_old = pd.notna(value), pd.notna(record[3])
+                    else:
+                        known_new, known_old = value != "0", record[field] != "0"
+
+                    if not known_new:
+                        continue
+                    if not known_old:
+                        record[field] = value
+                        origins[(pos, field)] = source["name"]
+                    elif record[field] != value:
+                        conflicts.append((
+                            animal_id,
+                            field,
+                            record[field],
+                            origins.get((pos, field), sources[first_source]["name"]),
+                            value,
+                            source["name"],
+                        ))
+
+                if source["name"] not in record[4].split(", "):
+                    record[4] += ", " + source["name"]
+
+    return records, conflicts
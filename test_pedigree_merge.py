@@ -0,0 +1,114 @@
+import io
+
+import pandas as pd
+
+from pedigree_merge import detect_encoding, merge_pedigree_sources, normalize_id, parse_birth_dates
+
+
+def make_source(name, text, separator=",", encoding="utf-8"):
+    return {
+        "name": name,
+        "file": io.BytesIO(text.encode(encoding)),
+        "separator": separator,
+        "encoding": encoding,
+        "id_col": "ID",
+        "sire_col": "Vader",
+        "dam_col": "Moeder",
+        "dob_col": "Geboortedatum",
+    }
+
+
+def test_normalize_id():
+    assert normalize_id(" 15 ") == "15"
+    for value in ["0", "", "nan", "None", float("nan")]:
+        assert normalize_id(value) == "0"
+
+
+def test_detect_encoding():
+    assert detect_encoding(io.BytesIO("ID\né\n".encode("utf-8"))) == "utf-8"
+    assert detect_encoding(io.BytesIO("ID\né\n".encode("latin1"))) == "latin1"
+
+
+def test_fill_in_from_later_source():
+    a = make_source("a.csv", "ID,Vader,Moeder,Geboortedatum\n1,0,0,\n2,0,0,1-1-1970\n")
+    b = make_source("b.csv", "ID;Vader;Moeder;Geboortedatum\n 1 ;5;6;1-1-1980\n", separator=";")
+
+    records, conflicts = merge_pedigree_sources([a, b])
+
+    assert [r[:3] for r in records] == [["1", "5", "6"], ["2", "0", "0"]]
+    assert str(records[0][3].date()) == "1980-01-01"
+    assert records[0][4] == "a.csv, b.csv"
+    assert conflicts == []
+
+
+def test_conflicts_between_sources():
+    a = make_source("a.csv", "ID,Vader,Moeder,Geboortedatum\n1,5,0,1-1-1980\n")
+    b = make_source("b.csv", "ID,Vader,Moeder,Geboortedatum\n1,7,6,\n")
+    c = make_source("c.csv", "ID,Vader,Moeder,Geboortedatum\n1,5,8,\n")
+
+    records, conflicts = merge_pedigree_sources([a, b, c])
+
+    assert len(records) == 1
+    assert records[0][1:3] == ["5", "6"]
+    assert conflicts == [
+        ("1", 1, "5", "a.csv", "7", "b.csv"),
+        ("1", 2, "6", "b.csv", "8", "c.csv"),
+    ]
+
+
+def test_dates_do_not_depend_on_chunk_size():
+    text = "ID,Vader,Moeder,Geboortedatum\n1,0,0,\n2,0,0,12-01-2000\n3,0,0,25-01-2000\n4,0,0,13-01-2000\n5,0,0,01-02-2000\n"
+
+    whole, _ = merge_pedigree_sources([make_source("a.csv", text)])
+    chunked, _ = merge_pedigree_sources([make_source("a.csv", text)], chunksize=2)
+
+    assert [str(r[3]) for r in chunked] == [str(r[3]) for r in whole]
+    assert [str(r[3].date()) for r in whole[1:]] == ["2000-01-12", "2000-01-25", "2000-01-13", "2000-02-01"]
+
+
+def test_ambiguous_dates_read_the_same_in_every_source():
+    a = make_source("a.csv", "ID,Vader,Moeder,Geboortedatum\n1,0,0,25-01-2000\n2,0,0,03-02-2001\n")
+    b = make_source("b.csv", "ID,Vader,Moeder,Geboortedatum\n3,0,0,01-01-1999\n2,0,0,03-02-2001\n")
+
+    records, conflicts = merge_pedigree_sources([a, b])
+
+    assert str(records[1][3].date()) == "2001-02-03"
+    assert str(records[2][3].date()) == "1999-01-01"
+    assert conflicts == []
+
+
+def test_duplicates_within_one_source_are_kept():
+    a = make_source("a.csv", "ID,Vader,Moeder,Geboortedatum\n1,0,0,\n2,0,0,\n2,0,0,\n")
+    b = make_source("b.csv", "ID,Vader,Moeder,Geboortedatum\n1,5,0,\n1,6,0,\n")
+
+    records, conflicts = merge_pedigree_sources([a, b])
+
+    assert [r[:2] + [r[4]] for r in records] == [
+        ["1", "5", "a.csv, b.csv"],
+        ["2", "0", "a.csv"],
+        ["2", "0", "a.csv"],
+        ["1", "6", "b.csv"],
+    ]
+    assert conflicts == []
+
+
+def test_parse_birth_dates_matches_merge():
+    dates = pd.Series([None, "01-02-2000", "25-01-2000"])
+
+    assert [str(d.date()) for d in parse_birth_dates(dates)[1:]] == ["2000-02-01", "2000-01-25"]
+
+
+def test_unguessable_dates_fall_back_to_day_first():
+    parsed = parse_birth_dates(pd.Series(["onbekend", "03-02-2001", "+01:00", "-05:00"]))
+
+    assert str(parsed[1].date()) == "2001-02-03"
+    assert parsed.drop(1).isna().all()
+
+
+def test_merge_skips_unguessable_first_date():
+    a = make_source("a.csv", "ID,Vader,Moeder,Geboortedatum\n1,0,0,onbekend\n2,0,0,03-02-2001\n")
+
+    records, _ = merge_pedigree_sources([a], chunksize=1)
+
+    assert pd.isna(records[0][3])
+    assert str(records[1][3].date()) == "2001-02-03"